@@ -4,6 +4,7 @@ from sseclient import SSEClient
 import asyncio
 import aiohttp
 import logging
+import sys
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -14,6 +15,29 @@ class MCPClient:
         self.base_url = base_url
         self.messages_url = f"{base_url}/mcp/messages"
         self.sse_url = f"{base_url}/mcp/sse"
+        self._session = None
+
+    @property
+    def session(self):
+        """Pooled HTTP session reused by all requests, opened on first use."""
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                timeout=aiohttp.ClientTimeout(total=30),
+                connector=aiohttp.TCPConnector(limit=100, ttl_dns_cache=300, keepalive_timeout=60),
+            )
+        return self._session
+
+    async def close(self):
+        """Close the HTTP session and its pooled connections."""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
 
     async def list_tools(self):
         """List all available tools from the MCP server."""
@@ -25,25 +49,23 @@ class MCPClient:
                 "data": {}
             }
             
-            async with aiohttp.ClientSession() as session:
-                async with session.post(self.messages_url, json=introspection_message) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        return data.get("data", {})
-                    else:
-                        error_text = await response.text()
-                        logger.error(f"Failed to get tools. Status code: {response.status}")
-                        logger.error(f"Error response: {error_text}")
-                        return None
+            async with self.session.post(self.messages_url, json=introspection_message) as response:
+                if response.status == 200:
+                    data = await response.json()
+                    return data.get("data", {})
+                else:
+                    error_text = await response.text()
+                    logger.error(f"Failed to get tools. Status code: {response.status}")
+                    logger.error(f"Error response: {error_text}")
+                    return None
         except Exception as e:
             logger.error(f"Error listing tools: {e}")
             return None
 
 async def main():
-    client = MCPClient()
-    
-    # Get and display tools
-    tools_info = await client.list_tools()
+    async with MCPClient() as client:
+        # Get and display tools
+        tools_info = await client.list_tools()
     if tools_info:
         print("\nAvailable MCP Tools and Resources:")
         print("=" * 40)
@@ -63,4 +85,8 @@ async def main():
         print("Failed to retrieve tools information")
 
 if __name__ == "__main__":
-    asyncio.run(main()) 
\ No newline at end of file
+    if sys.platform != "win32":
+        import uvloop
+        uvloop.run(main())
+    else:
+        asyncio.run(main()) 
\ No newline at end of file
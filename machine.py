@@ -1,44 +1,130 @@
+import os
 import platform
 import subprocess
 import json
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
+# Hardware details are static, so cache them on disk between runs. The cache lives
+# in the per-user cache directory since it can hold root-only hardware details.
+CACHE_DIR = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+CACHE_FILE = os.path.join(CACHE_DIR, 'machine_info.json')
+CACHE_TTL = 3600  # seconds
+
+# Commands to run for detailed system information, keyed by platform
+PLATFORM_COMMANDS = {
+    "Windows": {
+        'systeminfo': ['systeminfo'],
+    },
+    "Linux": {
+        'lshw': ['lshw'],
+        'uname': ['uname', '-a'],
+    },
+    "Darwin": {  # Darwin is the internal name for macOS
+        'sw_vers': ['sw_vers'],
+        # 'system_profiler': ['system_profiler', 'SPHardwareDataType'],
+    },
+}
+
+def read_file(path):
+    """Read a small text file, returning None if it is missing or unreadable"""
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+def get_linux_info():
+    """Read common hardware fields straight from /proc and /sys without forking"""
+    linux_info = {}
+
+    cpuinfo = read_file('/proc/cpuinfo') or ''
+    for line in cpuinfo.splitlines():
+        if line.startswith('model name'):
+            linux_info['cpu_model'] = line.partition(':')[2].strip()
+            break
+    linux_info['cpu_count'] = os.cpu_count()
+
+    meminfo = read_file('/proc/meminfo') or ''
+    for line in meminfo.splitlines():
+        if line.startswith('MemTotal'):
+            linux_info['mem_total'] = line.partition(':')[2].strip()
+            break
+
+    for field in ('sys_vendor', 'product_name', 'board_name', 'bios_version'):
+        value = read_file(f'/sys/class/dmi/id/{field}')
+        if value is not None:
+            linux_info[field] = value
+
+    return linux_info
+
+def run_commands(commands):
+    """Run the given commands concurrently and return their stripped output by key"""
+    with ThreadPoolExecutor(max_workers=len(commands) or 1) as executor:
+        futures = {
+            key: executor.submit(subprocess.check_output, cmd, stderr=subprocess.STDOUT, text=True)
+            for key, cmd in commands.items()
+        }
+        return {key: future.result().strip() for key, future in futures.items()}
+
+def load_cached_info():
+    """Return the cached system info if it is younger than CACHE_TTL and owned by us"""
+    try:
+        stat = os.stat(CACHE_FILE)
+        # Ignore cache files planted by another user
+        if hasattr(os, 'getuid') and stat.st_uid != os.getuid():
+            return None
+        if time.time() - stat.st_mtime < CACHE_TTL:
+            with open(CACHE_FILE) as f:
+                return json.load(f)
+    except (OSError, ValueError):
+        pass
+    return None
+
+def save_cached_info(system_info):
+    """Atomically write the system info to a private cache file, ignoring write failures"""
+    tmp_file = f'{CACHE_FILE}.{os.getpid()}.tmp'
+    try:
+        os.makedirs(CACHE_DIR, mode=0o700, exist_ok=True)
+        fd = os.open(tmp_file, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with os.fdopen(fd, 'w') as f:
+            json.dump(system_info, f)
+        os.replace(tmp_file, CACHE_FILE)
+    except OSError:
+        try:
+            os.remove(tmp_file)
+        except OSError:
+            pass
+
 def get_system_info():
     try:
-        # Initialize an empty dictionary to store the system info
-        system_info = {}
+        system_info = load_cached_info()
+
+        if system_info is None:
+            # Initialize an empty dictionary to store the system info
+            system_info = {}
 
-        # Get basic system information using the platform module
-        system_info['system'] = platform.system()
-        system_info['node'] = platform.node()
-        system_info['release'] = platform.release()
-        system_info['version'] = platform.version()
-        system_info['machine'] = platform.machine()
-        system_info['processor'] = platform.processor()
+            # Get basic system information using the platform module
+            system_info['system'] = platform.system()
+            system_info['node'] = platform.node()
+            system_info['release'] = platform.release()
+            system_info['version'] = platform.version()
+            system_info['machine'] = platform.machine()
+            system_info['processor'] = platform.processor()
+
+            # Read the common fields directly on Linux
+            if system_info['system'] == "Linux":
+                system_info.update(get_linux_info())
+
+            # Get more detailed system information based on the platform
+            system_info.update(run_commands(PLATFORM_COMMANDS.get(system_info['system'], {})))
+
+            save_cached_info(system_info)
 
         # Get the current date and time
         system_info['executed_time'] = datetime.now().isoformat()
 
-        # Get more detailed system information based on the platform
-        if platform.system() == "Windows":
-            # Execute the systeminfo command and capture the output
-            output = subprocess.check_output(['systeminfo'], stderr=subprocess.STDOUT, text=True)
-            system_info['systeminfo'] = output.strip()
-        elif platform.system() == "Linux":
-            # Get detailed hardware information using lshw
-            output = subprocess.check_output(['lshw'], stderr=subprocess.STDOUT, text=True)
-            system_info['lshw'] = output.strip()
-            # Get detailed system information using uname
-            output = subprocess.check_output(['uname', '-a'], stderr=subprocess.STDOUT, text=True)
-            system_info['uname'] = output.strip()
-        elif platform.system() == "Darwin":  # Darwin is the internal name for macOS
-            # Get macOS version using sw_vers
-            output = subprocess.check_output(['sw_vers'], stderr=subprocess.STDOUT, text=True)
-            system_info['sw_vers'] = output.strip()
-            # Get detailed system information using system_profiler
-            output = subprocess.check_output(['system_profiler', 'SPHardwareDataType'], stderr=subprocess.STDOUT, text=True)
-            # system_info['system_profiler'] = output.strip()
-
         # Convert the dictionary to a JSON string
         json_info = json.dumps(system_info, indent=4)
 
@@ -53,4 +139,4 @@ def get_system_info():
         print(f"An unexpected error occurred: {e}")
 
 # Call the function to get and print system info
-get_system_info()
\ No newline at end of file
+get_system_info()
@@ -2,116 +2,363 @@ from mcp.server.fastmcp import FastMCP
 from starlette.applications import Starlette
 from starlette.routing import Route, Mount
 from starlette.requests import Request
-from starlette.responses import Response, JSONResponse, StreamingResponse
+from starlette.responses import Response, StreamingResponse
 from starlette.background import BackgroundTask
 from starlette.middleware import Middleware
-from starlette.middleware.cors import CORSMiddleware
 import logging
+import logging.config
+import copy
+import inspect
 import sys
 import os
 import traceback
 import asyncio
+import base64
 import json
-from typing import List, Dict
+import orjson
+import msgpack
+from typing import Callable, Dict, List, Optional, Tuple
 import re
+from collections import deque
+from itertools import islice
+from operator import itemgetter
 from datetime import datetime
 
+logger = logging.getLogger(__name__)
+
 # Create an MCP server
 mcp = FastMCP("Demo")
 
-# Store active SSE connections
-connections: List[asyncio.Queue] = []
+# Wire formats supported for MCP messages, JSON being the default for browser clients
+MEDIA_TYPES = {
+    "json": "application/json",
+    "msgpack": "application/msgpack",
+}
+
+# Shared ring buffers of recent SSE frames, one per codec; clients that fall
+# further behind than RING_SIZE frames are dropped
+RING_SIZE = 1024
+rings: Dict[str, deque] = {codec: deque(maxlen=RING_SIZE) for codec in MEDIA_TYPES}
+
+# Maximum number of pending frames coalesced into one streamed chunk
+MAX_BATCH_FRAMES = 32
+
+# Total number of frames ever published to each ring
+ring_positions: Dict[str, int] = {codec: 0 for codec in MEDIA_TYPES}
+
+# Number of active SSE connections per codec
+subscribers: Dict[str, int] = {codec: 0 for codec in MEDIA_TYPES}
+
+# Set and immediately cleared on every publish to a codec to wake its SSE streams.
+# Events bind to the loop that first waits on them, so they are created lazily for
+# the running loop rather than at import.
+new_data: Dict[str, asyncio.Event] = {}
+new_data_loop: Optional[asyncio.AbstractEventLoop] = None
+
+def wake_events() -> Dict[str, asyncio.Event]:
+    """Return the per-codec wake-up events for the running event loop"""
+    global new_data, new_data_loop
+    loop = asyncio.get_running_loop()
+    if new_data_loop is not loop:
+        new_data = {codec: asyncio.Event() for codec in MEDIA_TYPES}
+        new_data_loop = loop
+    return new_data
+
+# Store tool functions as (func, names, getter, bind) entries. Tools taking only
+# required positional parameters are called as func(*getter(params)); any other
+# signature is handled by a generic bind(params) callable instead.
+tool_handlers: Dict[str, Tuple[Callable, Tuple[str, ...], Optional[Callable], Optional[Callable]]] = {}
+
+def tool_param_error(tool_name: str, names, tool_params: dict) -> ValueError:
+    """Describe the first missing or unknown parameter in a tool call"""
+    for name in names:
+        if name not in tool_params:
+            return ValueError(f"Missing parameter '{name}' for tool: {tool_name}")
+    unknown = ", ".join(sorted(tool_params.keys() - set(names)))
+    return ValueError(f"Unknown parameters for tool {tool_name}: {unknown}")
+
+def make_binder(tool_name: str, func: Callable, signature: inspect.Signature) -> Callable:
+    """Build a call for tools with keyword-only, default or **kwargs parameters"""
+    parameters = []
+    accepts_extra = False
+    for param in signature.parameters.values():
+        if param.kind == inspect.Parameter.VAR_KEYWORD:
+            accepts_extra = True
+        elif param.kind != inspect.Parameter.VAR_POSITIONAL:
+            parameters.append((param.name, param.kind == inspect.Parameter.KEYWORD_ONLY, param.default))
+    names = frozenset(name for name, _, _ in parameters)
+
+    def bind(tool_params: dict):
+        args = []
+        kwargs = {}
+        for name, keyword_only, default in parameters:
+            if name in tool_params:
+                value = tool_params[name]
+            elif default is not inspect.Parameter.empty:
+                value = default
+            else:
+                raise ValueError(f"Missing parameter '{name}' for tool: {tool_name}")
+            if keyword_only:
+                kwargs[name] = value
+            else:
+                args.append(value)
+        unknown = tool_params.keys() - names
+        if unknown:
+            if not accepts_extra:
+                raise ValueError(f"Unknown parameters for tool {tool_name}: {', '.join(sorted(unknown))}")
+            kwargs.update((name, tool_params[name]) for name in unknown)
+        return func(*args, **kwargs)
+
+    return bind
+
+def register_tool(func: Callable):
+    """Register a tool function under its own name"""
+    # Resolve the signature once so calls only need dict lookups
+    tool_name = func.__name__
+    signature = inspect.signature(func)
+    params = signature.parameters.values()
+    if all(
+        param.kind in (inspect.Parameter.POSITIONAL_ONLY, inspect.Parameter.POSITIONAL_OR_KEYWORD)
+        and param.default is inspect.Parameter.empty
+        for param in params
+    ):
+        names = tuple(param.name for param in params)
+        # itemgetter returns a bare value for a single key, so wrap that case
+        if len(names) == 1:
+            name = names[0]
+            getter = lambda tool_params: (tool_params[name],)
+        else:
+            getter = itemgetter(*names) if names else lambda tool_params: ()
+        tool_handlers[tool_name] = (func, names, getter, None)
+    else:
+        tool_handlers[tool_name] = (func, (), None, make_binder(tool_name, func, signature))
 
-# Store resource handlers
-resource_handlers = {}
+# Store resource handlers as (matcher, handler, is_async) entries
+resource_handlers: List[Tuple[Callable[[str], Optional[dict]], Callable, bool]] = []
+
+def compile_resource_pattern(pattern: str) -> Callable[[str], Optional[dict]]:
+    """Build a matcher returning the named parameters of a path, or None"""
+    start = pattern.find("{")
+    if pattern.count("{") == 1 and pattern.count("}") == 1 and pattern.endswith("}"):
+        # A single trailing placeholder only needs a prefix check and one slice
+        prefix, param = pattern[:start], pattern[start + 1:-1]
+        offset = len(prefix)
+
+        def match(path: str) -> Optional[dict]:
+            if path.startswith(prefix):
+                value = path[offset:]
+                if value and "/" not in value:
+                    return {param: value}
+            return None
+
+        return match
+
+    # Convert pattern to regex by escaping special characters and handling parameters
+    regex_pattern = "^" + re.escape(pattern).replace("\\{", "(?P<").replace("\\}", ">[^/]+)") + "$"
+    compiled = re.compile(regex_pattern)
+
+    def match(path: str) -> Optional[dict]:
+        found = compiled.match(path)
+        return found.groupdict() if found else None
+
+    return match
 
 def register_resource(pattern: str, handler):
     """Register a resource handler with a pattern"""
-    resource_handlers[pattern] = handler
+    # Decide once whether the handler needs to be awaited
+    resource_handlers.append((compile_resource_pattern(pattern), handler, asyncio.iscoroutinefunction(handler)))
 
 async def get_resource(resource_path: str, params: dict):
     """Get a resource by its path and parameters"""
     # Find matching resource pattern
-    for pattern, handler in resource_handlers.items():
-        # Convert pattern to regex by escaping special characters and handling parameters
-        regex_pattern = "^" + re.escape(pattern).replace("\\{", "(?P<").replace("\\}", ">[^/]+)") + "$"
-        match = re.match(regex_pattern, resource_path)
-        if match:
-            # Extract named parameters from the match
-            named_params = match.groupdict()
+    for match, handler, is_async in resource_handlers:
+        named_params = match(resource_path)
+        if named_params is not None:
             # Merge with provided params
             all_params = {**named_params, **params}
             # Call the handler with parameters
-            return await handler(**all_params) if asyncio.iscoroutinefunction(handler) else handler(**all_params)
+            return await handler(**all_params) if is_async else handler(**all_params)
     raise ValueError(f"No resource found for path: {resource_path}")
 
-async def stream_events(queue: asyncio.Queue):
+def negotiate_codec(header: str) -> str:
+    """Pick the wire format from an Accept or Content-Type header value"""
+    return "msgpack" if "msgpack" in header else "json"
+
+# Both wire formats only carry integers in the signed/unsigned 64-bit range
+INT_MIN = -2**63
+INT_MAX = 2**64 - 1
+
+# Digit runs long enough to possibly fall outside that range
+LONG_DIGITS = re.compile(rb"\d{19,}")
+
+class PayloadError(ValueError):
+    """Raised for message content the wire format cannot represent exactly"""
+
+def has_wide_int(value) -> bool:
+    """Check whether a decoded message holds an integer outside the 64-bit range"""
+    if isinstance(value, int) and not isinstance(value, bool):
+        return not INT_MIN <= value <= INT_MAX
+    if isinstance(value, dict):
+        return any(has_wide_int(item) for item in value.values())
+    if isinstance(value, (list, tuple)):
+        return any(has_wide_int(item) for item in value)
+    return False
+
+def encode(message, codec: str) -> bytes:
+    """Serialize a message with the given codec"""
+    try:
+        if codec == "msgpack":
+            return msgpack.packb(message, use_bin_type=True)
+        return orjson.dumps(message)
+    except (TypeError, OverflowError):
+        if has_wide_int(message):
+            raise PayloadError("Integer exceeds 64-bit range") from None
+        raise
+
+def decode(body: bytes, codec: str):
+    """Deserialize a message body with the given codec"""
+    if codec == "msgpack":
+        return msgpack.unpackb(body, raw=False)
+    if LONG_DIGITS.search(body) is None:
+        return orjson.loads(body)
+    # orjson silently turns integers beyond 64 bits into floats, so parse exactly
+    data = json.loads(body)
+    if has_wide_int(data):
+        raise PayloadError("Integer exceeds 64-bit range")
+    return data
+
+def sse_frame(payload: bytes, codec: str) -> bytes:
+    """Wrap an encoded payload in an SSE frame, base64-encoding binary codecs"""
+    if codec == "msgpack":
+        payload = base64.b64encode(payload)
+    return b"data: " + payload + b"\n\n"
+
+# Encoded response envelope around the result, so {"type": "response", "data": ...}
+# never has to be built as a dict; msgpack's prefix drops the trailing nil byte
+RESPONSE_ENVELOPES = {
+    "json": (b'{"type":"response","data":', b"}"),
+    "msgpack": (msgpack.packb({"type": "response", "data": None})[:-1], b""),
+}
+
+def encode_response(result, codec: str) -> bytes:
+    """Serialize a response carrying ``result`` by wrapping the encoded result"""
+    prefix, suffix = RESPONSE_ENVELOPES[codec]
+    return prefix + encode(result, codec) + suffix
+
+# The introspection response never changes, so serialize it once per codec at import
+INTROSPECT_RESPONSE = {
+    "type": "response",
+    "data": {
+        "tools": [
+            {
+                "name": "add",
+                "description": "Add two numbers",
+                "parameters": {
+                    "a": {"type": "integer"},
+                    "b": {"type": "integer"}
+                },
+                "returns": {"type": "integer"}
+            },
+            {
+                "name": "get_metrics",
+                "description": "Get metrics related to a specific question",
+                "parameters": {
+                    "question": {"type": "string"}
+                },
+                "returns": {"type": "object"}
+            }
+        ],
+        "resources": [
+            "greeting://{name}"
+        ]
+    }
+}
+INTROSPECT_PAYLOADS = {codec: encode(INTROSPECT_RESPONSE, codec) for codec in MEDIA_TYPES}
+INTROSPECT_FRAMES = {codec: sse_frame(payload, codec) for codec, payload in INTROSPECT_PAYLOADS.items()}
+
+async def stream_events(codec: str, last_seen: int):
+    # Bind hot-path lookups to locals; cancellation on disconnect is left to Starlette
+    ring = rings[codec]
+    positions = ring_positions
+    wait = wake_events()[codec].wait
     while True:
-        try:
-            message = await queue.get()
-            if message is None:  # Connection close signal
-                break
-            yield f"data: {json.dumps(message)}\n\n"
-        except Exception as e:
-            logging.error(f"Error in stream_events: {e}")
-            break
+        position = positions[codec]
+        if last_seen == position:
+            await wait()
+            continue
+        oldest = position - len(ring)
+        if last_seen < oldest:
+            # Drop slow consumers instead of buffering without bound
+            logger.warning("SSE client fell behind the ring buffer, dropping connection")
+            return
+        frames = list(islice(ring, last_seen - oldest, None))
+        last_seen = position
+        # Coalesce the backlog so each chunk becomes a single socket write
+        for start in range(0, len(frames), MAX_BATCH_FRAMES):
+            yield b"".join(frames[start:start + MAX_BATCH_FRAMES])
 
 # SSE handlers
 async def handle_sse(request: Request):
-    queue = asyncio.Queue()
-    connections.append(queue)
+    # EventSource cannot set headers, so also accept the codec as a query parameter
+    codec = negotiate_codec(request.query_params.get("codec") or request.headers.get("accept", ""))
+    subscribers[codec] += 1
     
     async def cleanup():
-        if queue in connections:
-            connections.remove(queue)
-            await queue.put(None)
+        subscribers[codec] -= 1
     
     return StreamingResponse(
-        stream_events(queue),
+        stream_events(codec, ring_positions[codec]),
         media_type="text/event-stream",
         headers={
             "Cache-Control": "no-cache",
             "Connection": "keep-alive",
             "X-Accel-Buffering": "no",
+            "X-MCP-Codec": codec,
         },
         background=BackgroundTask(cleanup)
     )
 
+def publish(frames: Dict[str, bytes]):
+    """Append a frame to the ring of every codec with subscribers and wake the streams
+
+    Publishing never awaits: frames go into the shared ring buffers and
+    clients read them at their own pace, so a slow client cannot delay the
+    others.
+    """
+    events = wake_events()
+    for codec, count in subscribers.items():
+        if count:
+            rings[codec].append(frames[codec])
+            ring_positions[codec] += 1
+            event = events[codec]
+            event.set()
+            event.clear()
+
+def broadcast(result, encoded: Dict[str, bytes]):
+    """Publish a response carrying ``result`` to every SSE client, serializing once per codec
+
+    Payloads are memoized in ``encoded`` so the caller can reuse them.
+    """
+    frames = {}
+    for codec, count in subscribers.items():
+        if count:
+            if codec not in encoded:
+                encoded[codec] = encode_response(result, codec)
+            frames[codec] = sse_frame(encoded[codec], codec)
+    publish(frames)
+
 async def handle_messages(request: Request):
+    codec = negotiate_codec(request.headers.get("accept", ""))
     try:
-        data = await request.json()
-        logging.info(f"Received message: {data}")
+        data = decode(await request.body(), negotiate_codec(request.headers.get("content-type", "")))
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("Received message: %s", data)
         
         # Handle the message based on its type
         if data.get("type") == "request" and data.get("action") == "introspect":
-            # Handle introspection request
-            response = {
-                "type": "response",
-                "data": {
-                    "tools": [
-                        {
-                            "name": "add",
-                            "description": "Add two numbers",
-                            "parameters": {
-                                "a": {"type": "integer"},
-                                "b": {"type": "integer"}
-                            },
-                            "returns": {"type": "integer"}
-                        },
-                        {
-                            "name": "get_metrics",
-                            "description": "Get metrics related to a specific question",
-                            "parameters": {
-                                "question": {"type": "string"}
-                            },
-                            "returns": {"type": "object"}
-                        }
-                    ],
-                    "resources": [
-                        "greeting://{name}"
-                    ]
-                }
-            }
+            # Introspection is static, so reuse the prebuilt payloads and frames
+            publish(INTROSPECT_FRAMES)
+            return Response(INTROSPECT_PAYLOADS[codec], media_type=MEDIA_TYPES[codec])
         else:
             # Handle tool execution or resource request
             if data.get("action") == "execute":
@@ -120,35 +367,46 @@ async def handle_messages(request: Request):
                 tool_params = data.get("data", {})
                 
                 # Get the tool function
-                if tool_name == "add":
-                    result = add(**tool_params)
-                elif tool_name == "get_metrics":
-                    result = get_metrics(**tool_params)
-                else:
+                tool = tool_handlers.get(tool_name)
+                if tool is None:
                     raise ValueError(f"Unknown tool: {tool_name}")
-                
-                response = {"type": "response", "data": result}
+                func, names, getter, bind = tool
+                if bind is not None:
+                    result = bind(tool_params)
+                else:
+                    if len(tool_params) != len(names):
+                        raise tool_param_error(tool_name, names, tool_params)
+                    try:
+                        args = getter(tool_params)
+                    except KeyError:
+                        raise tool_param_error(tool_name, names, tool_params) from None
+                    result = func(*args)
             elif data.get("action") == "get":
                 # Get resource
                 resource = data.get("resource")
                 resource_params = data.get("data", {})
                 result = await get_resource(resource, resource_params)
-                response = {"type": "response", "data": result}
             else:
                 raise ValueError(f"Unknown action: {data.get('action')}")
         
-        logging.info(f"Generated response: {response}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Generated response data: %s", result)
         
         # Broadcast response to all connected clients
-        for queue in connections:
-            await queue.put(response)
+        encoded: Dict[str, bytes] = {}
+        broadcast(result, encoded)
         
-        return JSONResponse(response)
+        payload = encoded.get(codec) or encode_response(result, codec)
+        return Response(payload, media_type=MEDIA_TYPES[codec])
+    except PayloadError as e:
+        logger.warning("Rejected message: %s", e)
+        error_response = {"error": str(e)}
+        return Response(encode(error_response, codec), status_code=400, media_type=MEDIA_TYPES[codec])
     except Exception as e:
-        logging.error(f"Error in handle_messages: {str(e)}")
-        logging.error(f"Traceback: {traceback.format_exc()}")
+        logger.error("Error in handle_messages: %s", e)
+        logger.error("Traceback: %s", traceback.format_exc())
         error_response = {"error": str(e)}
-        return JSONResponse(error_response, status_code=500)
+        return Response(encode(error_response, codec), status_code=500, media_type=MEDIA_TYPES[codec])
 
 # Add an addition tool
 @mcp.tool()
@@ -175,6 +433,10 @@ def get_metrics(question: str) -> dict:
     }
     return dummy_metrics
 
+# Register the tools for the messages endpoint
+register_tool(add)
+register_tool(get_metrics)
+
 # Add a dynamic greeting resource
 def get_greeting(name: str) -> str:
     """Get a personalized greeting"""
@@ -183,14 +445,57 @@ def get_greeting(name: str) -> str:
 # Register the greeting resource
 register_resource("greeting://{name}", get_greeting)
 
+# Wildcard CORS headers never vary, so encode them once for every response
+CORS_HEADERS = [
+    (b"access-control-allow-origin", b"*"),
+    (b"access-control-allow-methods", b"*"),
+    (b"access-control-allow-headers", b"*"),
+]
+# Preflight headers except allow-headers, which echoes the requested headers since
+# a literal "*" does not cover Authorization
+PREFLIGHT_HEADERS = [
+    (b"access-control-allow-origin", b"*"),
+    (b"access-control-allow-methods", b"*"),
+    (b"access-control-max-age", b"86400"),
+]
+
+class CORSHeadersMiddleware:
+    """ASGI middleware applying a fixed wildcard CORS policy with prebuilt headers"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        # Answer CORS preflight requests directly with the cached headers
+        if scope["method"] == "OPTIONS":
+            request_method = request_headers = None
+            for key, value in scope["headers"]:
+                if key == b"access-control-request-method":
+                    request_method = value
+                elif key == b"access-control-request-headers":
+                    request_headers = value
+            if request_method is not None:
+                headers = PREFLIGHT_HEADERS
+                if request_headers is not None:
+                    headers = [*headers, (b"access-control-allow-headers", request_headers)]
+                await send({"type": "http.response.start", "status": 204, "headers": headers})
+                await send({"type": "http.response.body", "body": b""})
+                return
+
+        async def send_with_cors(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", ()), *CORS_HEADERS]
+            await send(message)
+
+        await self.app(scope, receive, send_with_cors)
+
 # Create Starlette application with CORS middleware
 middleware = [
-    Middleware(
-        CORSMiddleware,
-        allow_origins=["*"],
-        allow_methods=["*"],
-        allow_headers=["*"],
-    )
+    Middleware(CORSHeadersMiddleware)
 ]
 
 # Create routes including the MCP-specific paths
@@ -213,15 +518,27 @@ if __name__ == "__main__":
         if not os.path.exists('logs'):
             os.makedirs('logs')
 
-        # Configure logging with both file and terminal output
-        logging.basicConfig(
-            level=logging.DEBUG,
-            format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-            handlers=[
-                logging.StreamHandler(sys.stdout),
-                logging.FileHandler('logs/server_sse.log')
-            ]
-        )
+        import uvicorn
+        from uvicorn.config import LOGGING_CONFIG
+
+        # Configure logging with both file and terminal output. The same config is
+        # handed to uvicorn so that worker processes apply it as well.
+        log_config = copy.deepcopy(LOGGING_CONFIG)
+        log_config["formatters"]["server"] = {
+            "format": '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        }
+        log_config["handlers"]["server_stdout"] = {
+            "class": "logging.StreamHandler",
+            "formatter": "server",
+            "stream": "ext://sys.stdout",
+        }
+        log_config["handlers"]["server_file"] = {
+            "class": "logging.FileHandler",
+            "formatter": "server",
+            "filename": "logs/server_sse.log",
+        }
+        log_config["root"] = {"level": "DEBUG", "handlers": ["server_stdout", "server_file"]}
+        logging.config.dictConfig(log_config)
         
         logger = logging.getLogger()
         logger.setLevel(logging.DEBUG)
@@ -240,9 +557,21 @@ if __name__ == "__main__":
         logger.info("\nMCP Inspector Connection:")
         logger.info("  - Use URL: http://localhost:8000 in the MCP Inspector")
 
-        # Start the server
-        import uvicorn
-        uvicorn.run(app, host="0.0.0.0", port=8000, log_level="info")
+        # Start the server. Each worker keeps its own SSE connections, so
+        # broadcasts only reach clients on the worker that handled the message;
+        # raising MCP_WORKERS is only safe when that is acceptable
+        workers = int(os.environ.get("MCP_WORKERS", 1))
+        logger.info("  - Workers: %d", workers)
+        uvicorn.run(
+            "server_sse:app",
+            workers=workers,
+            log_config=log_config,
+            host="0.0.0.0",
+            port=8000,
+            loop="uvloop" if sys.platform != "win32" else "asyncio",
+            http="httptools",
+            log_level="info",
+        )
     except KeyboardInterrupt:
         print("\nServer stopped by user")
     except Exception as e: